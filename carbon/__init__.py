@@ -1,6 +1,6 @@
 # Copyright (c) 2025 iiPython
 
-from .client import CarbonDB
+from .client import CarbonDB, AsyncCarbonDB
 
-__all__ = ["CarbonDB"]
+__all__ = ["CarbonDB", "AsyncCarbonDB"]
 __version__ = "0.2.1"
@@ -3,155 +3,347 @@
 # Modules
 import os
 import time
+import shutil
+import signal
+import socket
 import struct
 import typing
 import asyncio
+import multiprocessing
 from datetime import datetime
 
 import aiosqlite
 
+try:
+    import uvloop
+
+except ImportError:
+    uvloop = None
+
 from carbon import __version__
 from carbon.client import CarbonDB
 from carbon.enums import Response, Transaction
 
+# Precompiled wire format, so the hot path never reparses a format string
+_RESP = struct.Struct(">BI")
+
+# Member names by value, dodging Enum.__call__'s member lookup per log line
+_TXN_NAME = tuple(member.name for member in sorted(Transaction))
+_RSP_NAME = tuple(member.name for member in sorted(Response))
+
+# Fixed replies are framed once at import, so those paths skip framing entirely
+_AUTH_MESSAGE = b"Authentication not supported on this database."
+_UNKNOWN_MESSAGE = b"The specified transaction type does not exist."
+
+_HELO = _RESP.pack(Response.HELO, 0)
+_OPOK = _RESP.pack(Response.OPOK, 0)
+_FAIL_AUTH = _RESP.pack(Response.FAIL, len(_AUTH_MESSAGE)) + _AUTH_MESSAGE
+_FAIL_UNKNOWN = _RESP.pack(Response.FAIL, len(_UNKNOWN_MESSAGE)) + _UNKNOWN_MESSAGE
+
+# Hot-path SQL lives in constants so sqlite's statement cache is hit by identity
+_SQL_WRITE = "REPLACE INTO items (key, value) VALUES (?, ?)"
+_SQL_READ = "SELECT value FROM items WHERE key = ?"
+_SQL_WIPE = "DELETE FROM items WHERE key = ?"
+
 # Handle logging
 class Logging:
     def __init__(self) -> None:
+        self._width: int = shutil.get_terminal_size()[0]
+        self._stamp: str = ""
+        self._stamp_second: int = 0
+        self._queue: asyncio.Queue[tuple[int, int, int, float, bytes]] = asyncio.Queue()
+        self._consumer: typing.Optional[asyncio.Task] = None
+
+        # Keep the cached width fresh without paying an ioctl per log line
+        try:
+            signal.signal(signal.SIGWINCH, self._handle_resize)
+
+        except ValueError:
+            pass  # Not the main thread, stick with the startup width
+
         print("\033[2J\033[H", end = "")
         self.log("!", f"Carbon v{__version__} is running, Copyright (c) 2025 iiPython.")
 
+    def _handle_resize(self, *_) -> None:
+        self._width = shutil.get_terminal_size()[0]
+
+    def _timestamp(self) -> str:
+        second = int(time.time())
+        if second != self._stamp_second:
+            self._stamp_second = second
+            self._stamp = datetime.fromtimestamp(second).strftime("%D %I:%M:%S %p")
+
+        return self._stamp
+
+    def start(self) -> None:
+        self._consumer = asyncio.create_task(self._consume())
+
+    async def _consume(self) -> None:
+        while True:
+            type, response_type, packet_size, elapsed, transaction_id = await self._queue.get()
+            name = _TXN_NAME[type] if type < len(_TXN_NAME) else "????"
+            # The id comes straight off the wire, so decode defensively — one junk
+            # packet must not take down logging for the rest of the process
+            self.log("@", f"Code: {type} ({name}) │ Response: {response_type} ({_RSP_NAME[response_type]}) │ Size: {packet_size:05d}b │ Transaction: {transaction_id.decode('ascii', errors = 'replace')} │ Elapsed: {elapsed}μs")
+
     def log(self, icon: str, text: str) -> None:
-        timestamp = datetime.now().strftime("%D %I:%M:%S %p")
-        print(f"\033[1;30;41m {icon} \033[0;39;40m {text}{' ' * (os.get_terminal_size()[0] - (len(text) + len(timestamp) + 7))} \033[1;30;44m {timestamp} \033[0m")
+        timestamp = self._timestamp()
+        print(f"\033[1;30;41m {icon} \033[0;39;40m {text}{' ' * (self._width - (len(text) + len(timestamp) + 7))} \033[1;30;44m {timestamp} \033[0m")
 
-    def add_transaction(self, type: int, response: bytes, start_time: float, transaction_id: str) -> None:
-        response_type, packet_size = response[0], str(int.from_bytes(response[1:5]))
-        self.log("@", f"Code: {type} ({Transaction(type).name}) │ Response: {response_type} ({Response(response_type).name}) │ Size: {packet_size.zfill(5)}b │ Transaction: {transaction_id} │ Elapsed: {round((time.perf_counter_ns() - start_time) / 1000, 2)}μs")
+    def add_transaction(self, type: int, response: bytes, start_time: float, transaction_id: bytes) -> None:
+        response_type, packet_size = _RESP.unpack_from(response)
+        self._queue.put_nowait((type, response_type, packet_size, round((time.perf_counter_ns() - start_time) / 1000, 2), transaction_id))
 
     def add_connection(self, type: str, source: str) -> None:
         self.log("!", f"Connection {type} from {source[0]}:{source[1]}.")
-        
+
 # Main object
 class Carbon:
     def __init__(self) -> None:
-        self.db: typing.Optional[aiosqlite.Connection] = None
+        self.writer_db: typing.Optional[aiosqlite.Connection] = None
+        self.writer_lock: asyncio.Lock = asyncio.Lock()
+        self.reader_pool: asyncio.Queue[aiosqlite.Connection] = asyncio.Queue()
+        self.write_queue: asyncio.Queue[tuple[str, tuple[str, ...], asyncio.Future]] = asyncio.Queue()
+        self.commit_task: typing.Optional[asyncio.Task] = None
         self.logging: Logging = Logging()
 
+        # Indexed by transaction type, skipping the match/case comparison chain
+        self._handlers = (self._ping, self._writ, self._read, self._wipe, self._auth, self._peer)
+
     @staticmethod
-    def build_response(result: Response, data: str = "") -> bytes:
-        return struct.pack(
-            ">BI",
-            result.value,
-            len(data)
-        ) + data.encode("ascii")
+    def build_response(result: Response, data: str = "") -> bytearray:
+        payload = data.encode("ascii")
+
+        # Hand the bytearray straight back so the caller can splice it into the
+        # batch buffer without paying for a final bytes() copy
+        buffer = bytearray(5 + len(payload))
+        _RESP.pack_into(buffer, 0, result, len(payload))
+        buffer[5:] = payload
+        return buffer
+
+    @staticmethod
+    async def connect() -> aiosqlite.Connection:
+
+        # Tune SQLite for the hot REPLACE/DELETE path: WAL keeps readers running while
+        # we commit, and NORMAL sync halves the fsyncs per transaction.
+        db = await aiosqlite.connect("carbon.db", isolation_level = None, cached_statements = 512)
+        await db.executescript("""\
+            PRAGMA journal_mode = WAL;
+            PRAGMA synchronous = NORMAL;
+            PRAGMA temp_store = MEMORY;
+            PRAGMA cache_size = -65536;
+            PRAGMA mmap_size = 268435456;
+            PRAGMA busy_timeout = 5000;
+        """)
+        return db
 
     async def init(self) -> None:
-        self.db = await aiosqlite.connect("carbon.db")
-        await self.db.execute("""\
+        self.writer_db = await self.connect()
+
+        # WITHOUT ROWID clusters the table on the key itself, so both REPLACE and
+        # the READ lookup hit the primary key index directly.
+        await self.writer_db.execute("""\
             CREATE TABLE IF NOT EXISTS items (
-                key   STRING PRIMARY KEY,
-                value STRING
-            )
+                key   TEXT PRIMARY KEY,
+                value TEXT
+            ) WITHOUT ROWID
         """)
-        await self.db.execute("CREATE UNIQUE INDEX IF NOT EXISTS key_index ON items (key)")
 
-    async def handle(self, read_stream: asyncio.StreamReader, write_stream: asyncio.StreamWriter) -> None:
-        if self.db is None:
-            raise RuntimeError("The database is not connected internally, this is a bad sign.")
+        # In WAL mode SQLite happily runs one writer next to N readers, so READ
+        # transactions pull from a small pool instead of queueing behind commits.
+        for _ in range(4):
+            await self.reader_pool.put(await self.connect())
 
-        # Handle setting up the peer list
-        session_peers: list[asyncio.StreamWriter] = []
+        self.commit_task = asyncio.create_task(self._commit_loop())
+        self.logging.start()
 
-        address = write_stream.get_extra_info("peername")
-        self.logging.add_connection("established", address)
+    async def submit_write(self, sql: str, params: tuple[str, ...]) -> None:
+        future: asyncio.Future = asyncio.get_running_loop().create_future()
+        self.write_queue.put_nowait((sql, params, future))
+        await future
 
-        while read_stream:
-            payload = await read_stream.read(27)
-            if not payload:
-                break
+    async def _commit_loop(self) -> None:
+        while True:
+            batch = [await self.write_queue.get()]
+
+            # Give concurrent connections a moment to pile on, then flush everything
+            # in one transaction so the WAL fsync is paid once per batch instead of
+            # once per operation. The queue is FIFO, so per-key ordering is kept.
+            await asyncio.sleep(0.001)
+            while len(batch) < 256 and not self.write_queue.empty():
+                batch.append(self.write_queue.get_nowait())
 
-            start_time = time.perf_counter_ns()
+            try:
+                async with self.writer_lock:
+                    await self.writer_db.execute("BEGIN IMMEDIATE")
+                    for sql, params, _ in batch:
+                        await self.writer_db.execute(sql, params)
 
-            # Begin reading data stream
-            (
-                transaction_id,
-                transaction_type,
-                key_length,
-                value_length
-            ) = struct.unpack(">21sBBI", payload)
+                    await self.writer_db.commit()
 
-            key = (await read_stream.read(key_length)).decode("utf-8")
-            value = (await read_stream.read(value_length)).decode("utf-8")
+            except aiosqlite.Error as error:
 
-            # Handle transaction
-            match transaction_type:
-                case 0:  # PING
-                    response = self.build_response(Response.HELO)
+                # Back out of the open transaction, otherwise the writer is stuck
+                # inside it and every following batch fails to BEGIN
+                try:
+                    await self.writer_db.execute("ROLLBACK")
 
-                case 1:  # WRIT
-                    await self.db.execute("REPLACE INTO items (key, value) VALUES (?, ?)", (key, value))
-                    response = self.build_response(Response.OPOK)
+                except aiosqlite.Error:
+                    pass  # No transaction was actually open
 
-                    # Propagate change to peers
-                    for peer in session_peers:
-                        peer.write(CarbonDB.build_transaction(Transaction.WRIT, key, value))
+                for _, _, future in batch:
+                    future.set_exception(error)
 
-                    await self.db.commit()
+                continue
 
-                case 2:  # READ
-                    async with self.db.execute("SELECT value FROM items WHERE key = ?", (key,)) as cursor:
-                        value = await cursor.fetchone() or ("null",)
+            for _, _, future in batch:
+                future.set_result(None)
 
-                    response = self.build_response(Response.OPOK, value[0])
+    # Transaction handlers
+    async def _ping(self, key: str, value: str, session_peers: list[asyncio.StreamWriter], dirty_peers: set[asyncio.StreamWriter]) -> bytes | bytearray:
+        return _HELO
 
-                case 3:  # WIPE
-                    await self.db.execute("DELETE FROM items WHERE key = ?", (key,))
-                    response = self.build_response(Response.OPOK)
+    async def _writ(self, key: str, value: str, session_peers: list[asyncio.StreamWriter], dirty_peers: set[asyncio.StreamWriter]) -> bytes | bytearray:
+        await self.submit_write(_SQL_WRITE, (key, value))
 
-                    # Propagate change to peers
-                    for peer in session_peers:
-                        peer.write(CarbonDB.build_transaction(Transaction.WIPE, key))
+        # Propagate change to peers, deferring the drains to the end of the batch
+        for peer in session_peers:
+            peer.write(CarbonDB.build_transaction(Transaction.WRIT, key, value))
+
+        dirty_peers.update(session_peers)
+        return _OPOK
 
-                    await self.db.commit()
+    async def _read(self, key: str, value: str, session_peers: list[asyncio.StreamWriter], dirty_peers: set[asyncio.StreamWriter]) -> bytes | bytearray:
+        reader = await self.reader_pool.get()
+        try:
+            async with reader.execute(_SQL_READ, (key,)) as cursor:
+                row = await cursor.fetchone() or ("null",)
 
-                case 4:  # AUTH
-                    response = self.build_response(Response.FAIL, "Authentication not supported on this database.")
+        finally:
+            self.reader_pool.put_nowait(reader)
 
-                case 5:  # PEER
+        return self.build_response(Response.OPOK, row[0])
 
-                    # Begin opening connections
-                    for peer in value.strip("\"").split("/"):
+    async def _wipe(self, key: str, value: str, session_peers: list[asyncio.StreamWriter], dirty_peers: set[asyncio.StreamWriter]) -> bytes | bytearray:
+        await self.submit_write(_SQL_WIPE, (key,))
+
+        # Propagate change to peers, deferring the drains to the end of the batch
+        for peer in session_peers:
+            peer.write(CarbonDB.build_transaction(Transaction.WIPE, key))
 
-                        # Establish connection
-                        try:
-                            peer_reader, peer_writer = await asyncio.open_connection(
-                                peer.split(":")[0],
-                                int(peer.split(":")[1]) if ":" in peer else 13051
-                            )
+        dirty_peers.update(session_peers)
+        return _OPOK
 
-                            # Transmit and check ping
-                            peer_writer.write(CarbonDB.build_transaction(Transaction.PING, "TIME"))
-                            await peer_writer.drain()
+    async def _auth(self, key: str, value: str, session_peers: list[asyncio.StreamWriter], dirty_peers: set[asyncio.StreamWriter]) -> bytes | bytearray:
+        return _FAIL_AUTH
 
-                            if struct.unpack(">BI", await peer_reader.read(5))[0] != 0:
-                                raise ConnectionError
+    async def _peer(self, key: str, value: str, session_peers: list[asyncio.StreamWriter], dirty_peers: set[asyncio.StreamWriter]) -> bytes | bytearray:
 
-                            session_peers.append(peer_writer)
-                            self.logging.log("P", f"Connection to new peer established, host address is {peer}.")
+        # Begin opening connections
+        for peer in value.strip("\"").split("/"):
+            host, _, port = peer.partition(":")
 
-                        except (OSError, ConnectionError):
-                            self.logging.log("P", f"Failed to establish connection to peer {peer}.")
-                            continue
+            # Establish connection
+            try:
+                peer_reader, peer_writer = await asyncio.open_connection(host, int(port) if port else 13051)
 
-                    response = self.build_response(Response.OPOK)
+                # Transmit and check ping
+                peer_writer.write(CarbonDB.build_transaction(Transaction.PING, "TIME"))
+                await peer_writer.drain()
 
-                case _:
-                    response = self.build_response(Response.FAIL, "The specified transaction type does not exist.")
+                if _RESP.unpack(await peer_reader.read(5))[0] != 0:
+                    raise ConnectionError
 
-            self.logging.add_transaction(transaction_type, response, start_time, transaction_id.decode())
+                session_peers.append(peer_writer)
+                self.logging.log("P", f"Connection to new peer established, host address is {peer}.")
 
-            write_stream.write(response)
-            await write_stream.drain()
+            except (OSError, ConnectionError):
+                self.logging.log("P", f"Failed to establish connection to peer {peer}.")
+                continue
+
+        return _OPOK
+
+    async def _unknown(self, key: str, value: str, session_peers: list[asyncio.StreamWriter], dirty_peers: set[asyncio.StreamWriter]) -> bytes | bytearray:
+        return _FAIL_UNKNOWN
+
+    async def handle(self, read_stream: asyncio.StreamReader, write_stream: asyncio.StreamWriter) -> None:
+        if self.writer_db is None:
+            raise RuntimeError("The database is not connected internally, this is a bad sign.")
+
+        # Handle setting up the peer list
+        session_peers: list[asyncio.StreamWriter] = []
+        dirty_peers: set[asyncio.StreamWriter] = set()
+
+        address = write_stream.get_extra_info("peername")
+        self.logging.add_connection("established", address)
+
+        # Small responses should leave immediately instead of waiting on Nagle, and
+        # keepalive is set here by hand since uvloop's create_server has no kwarg for it
+        connection = write_stream.get_extra_info("socket")
+        if connection is not None:
+            connection.setsockopt(socket.IPPROTO_TCP, socket.TCP_NODELAY, 1)
+            connection.setsockopt(socket.SOL_SOCKET, socket.SO_KEEPALIVE, 1)
+
+        buffer = bytearray()
+        while True:
+            chunk = await read_stream.read(65536)
+            if not chunk:
+                break
+
+            buffer += chunk
+            responses = bytearray()
+
+            # Consume every complete packet sitting in the buffer, so a pipelined
+            # burst of transactions costs a single await instead of one per field
+            while len(buffer) >= 27:
+
+                # Index the scalar header fields directly rather than unpacking the
+                # whole header, which would allocate a bytes object for the 21-byte
+                # transaction id on every packet
+                transaction_type = buffer[21]
+                key_length = buffer[22]
+                value_length = int.from_bytes(buffer[23:27], "big")
+
+                total = 27 + key_length + value_length
+                if len(buffer) < total:
+                    break
+
+                start_time = time.perf_counter_ns()
+
+                # Slice key and value straight out of the buffer without copies
+                body = memoryview(buffer)
+                key = str(body[27:27 + key_length], "ascii")
+                value = str(body[27 + key_length:total], "ascii")
+
+                handler = self._handlers[transaction_type] if transaction_type < 6 else self._unknown
+                response = await handler(key, value, session_peers, dirty_peers)
+
+                # The id is only materialized here, on its way to the log consumer
+                self.logging.add_transaction(transaction_type, response, start_time, bytes(body[:21]))
+                body.release()
+
+                responses += response
+                del buffer[:total]
+
+            # Apply peer backpressure with one gathered drain per batch, instead of
+            # letting propagation buffer unboundedly on a slow peer
+            if dirty_peers:
+                drains = list(dirty_peers)
+                for peer, result in zip(drains, await asyncio.gather(*(peer.drain() for peer in drains), return_exceptions = True)):
+
+                    # A dead peer shouldn't take the client session down with it,
+                    # nor should every later write re-hit the same broken pipe
+                    if isinstance(result, Exception):
+                        session_peers.remove(peer)
+                        peer.close()
+                        self.logging.log("P", f"Killed off connection to unresponsive peer: {result}.")
+
+                dirty_peers.clear()
+
+            # One send() per parsed batch, not one per transaction
+            if responses:
+                write_stream.write(responses)
+                await write_stream.drain()
 
         self.logging.add_connection("lost", address)
 
@@ -173,9 +365,28 @@ async def main() -> None:
     carbon = Carbon()
     await carbon.init()
 
-    # Launch socket
-    async with await asyncio.start_server(carbon.handle, "0.0.0.0", int(os.getenv("PORT") or 13051), keep_alive = True) as host:
+    # Launch socket, pre-tuned by hand: SO_REUSEPORT lets multiple worker processes
+    # bind the same port and have the kernel load-balance accepts between them
+    sock = socket.socket(socket.AF_INET, socket.SOCK_STREAM)
+    sock.setsockopt(socket.SOL_SOCKET, socket.SO_REUSEPORT, 1)
+    sock.setsockopt(socket.IPPROTO_TCP, socket.TCP_NODELAY, 1)
+    sock.bind(("0.0.0.0", int(os.getenv("PORT") or 13051)))
+    sock.listen(4096)
+
+    async with await asyncio.start_server(carbon.handle, sock = sock) as host:
         await host.serve_forever()
 
-if __name__ == "__main__":
+def serve() -> None:
+    if uvloop is not None:
+        uvloop.install()
+
     asyncio.run(main())
+
+if __name__ == "__main__":
+
+    # WAL handles one writer per process just fine, so scaling out is as simple as
+    # launching extra workers against the same reuseport socket
+    for _ in range(int(os.getenv("WORKERS") or 1) - 1):
+        multiprocessing.Process(target = serve, daemon = True).start()
+
+    serve()
@@ -1,16 +1,40 @@
 # Copyright (c) 2025 iiPython
 
 # Modules
+import os
 import time
 import json
+import base64
 import socket
 import struct
 import typing
+import asyncio
 import logging
+import threading
+from collections import deque
+from concurrent.futures import ThreadPoolExecutor
 
-from nanoid import generate
 from carbon.enums import Transaction
 
+# Precompiled wire formats, so the hot path never reparses a format string
+_RESP = struct.Struct(">BI")
+_HDR = struct.Struct(">21sBBI")
+
+# Transaction ids come from a pooled urandom buffer, amortizing the entropy
+# syscall across 256 transactions instead of paying it on every single one.
+# The lock matters: select_host builds transactions from its probe threads.
+_ID_POOL: deque[bytes] = deque()
+_ID_LOCK = threading.Lock()
+
+def _next_id() -> bytes:
+    with _ID_LOCK:
+        if not _ID_POOL:
+            buffer = os.urandom(16 * 256)
+            for index in range(256):
+                _ID_POOL.append(base64.urlsafe_b64encode(buffer[index * 16:(index + 1) * 16])[:21])
+
+        return _ID_POOL.popleft()
+
 # Exceptions
 class NoAvailableNodes(Exception):
     pass
@@ -18,20 +42,22 @@ class NoAvailableNodes(Exception):
 # Sandboxing
 class Sandbox:
     """A sandbox representing the state of a collection in the database."""
-    
+
+    __slots__ = ("_db", "_name", "_value")
+
     def __init__(self, database, name: str, initial_value: dict[str, typing.Any] = {}) -> None:
         self._db = database
         self._name: str = name
         self._value: dict[str, typing.Any] = initial_value
 
-    def __getattribute__(self, name: str) -> typing.Any:
-        if name in ["_db", "_name", "_value", "save"]:
-            return object.__getattribute__(self, name)
+    def __getattr__(self, name: str) -> typing.Any:
 
+        # Only called when the slot lookup misses, so normal attribute access
+        # (slots, save) skips this method entirely
         return self._value.get(name)
 
     def __setattr__(self, name: str, value: typing.Any) -> None:
-        if name in ["_db", "_name", "_value"]:
+        if name in Sandbox.__slots__:
             return object.__setattr__(self, name, value)
 
         self._value[name] = value
@@ -56,29 +82,38 @@ class CarbonDB:
         self.select_host()
 
     # Handle host selection
-    def select_host(self) -> None:
-        """Automatically selects a backend database based on its latency."""
-        open_sockets = []
-        for host in self.hosts:
-            start = time.time()
-
-            # Setup socket connection
-            try:
-                connection = socket.socket(socket.AF_INET, socket.SOCK_STREAM)
-                connection.connect((host.split(":")[0], int(host.split(":")[1]) if ":" in host else 13051))
-
-            except ConnectionError:
-                logging.debug(f"[ACK] The specified host '{host}' is unreachable.")
-                continue
+    def _probe(self, host: str) -> typing.Optional[tuple[socket.socket, float, str]]:
+        """Connect to the given host, returning its open socket and response latency."""
+        address, _, port = host.partition(":")
+        start = time.perf_counter()
+
+        # Setup socket connection
+        try:
+            connection = socket.socket(socket.AF_INET, socket.SOCK_STREAM)
+            connection.connect((address, int(port) if port else 13051))
+
+        except ConnectionError:
+            logging.debug(f"[ACK] The specified host '{host}' is unreachable.")
+            return None
+
+        # Send ping and record time
+        connection.sendall(self.build_transaction(Transaction.PING, "TIME"))
+        if _RESP.unpack(connection.recv(5))[0] != 0:
+            logging.debug(f"[ACK] The specified host '{host}' did not respond with HELO, skipping it.")
+            connection.close()
+            return None
+
+        latency = time.perf_counter() - start
+        logging.debug(f"[ACK] Host '{host}' is up and response latency was {round(latency * 1000, 2)}ms.")
+        return connection, latency, host
 
-            # Send ping and record time
-            connection.sendall(self.build_transaction(Transaction.PING, "TIME"))
-            if struct.unpack(">BI", connection.recv(5))[0] != 0:
-                logging.debug(f"[ACK] The specified host '{host}' did not respond with HELO, skipping it.")
-                continue
+    def select_host(self) -> None:
+        """Automatically selects a backend database based on its latency, probing every host in parallel so slow nodes don't delay the fast ones."""
+        if not self.hosts:
+            raise NoAvailableNodes
 
-            open_sockets.append((connection, time.time() - start, host))
-            logging.debug(f"[ACK] Host '{host}' is up and response latency was {round(open_sockets[-1][1] * 1000, 2)}ms.")
+        with ThreadPoolExecutor(max_workers = len(self.hosts)) as executor:
+            open_sockets = [result for result in executor.map(self._probe, self.hosts) if result is not None]
 
         if not open_sockets:
             raise NoAvailableNodes
@@ -104,10 +139,9 @@ class CarbonDB:
         if not isinstance(value, bytes):
             value = json.dumps(value).encode("utf-8") if value is not None else b""
 
-        return struct.pack(
-            ">21sBBI",
-            generate().encode("ascii"),
-            type.value,
+        return _HDR.pack(
+            _next_id(),
+            type,
             len(key),
             len(value),
         ) + key.encode("ascii") + value
@@ -122,7 +156,7 @@ class CarbonDB:
         self.active_connection.sendall(packet)
 
         # Receive result as well as the packet size
-        result, packet_size = struct.unpack(">BI", self.active_connection.recv(5))
+        result, packet_size = _RESP.unpack(self.active_connection.recv(5))
         return result, self.active_connection.recv(packet_size)
 
     def write(self, key: str, value: typing.Any) -> None:
@@ -149,3 +183,88 @@ class CarbonDB:
             collection,
             self.read(collection) or {}
         )
+
+# Async variant
+class AsyncCarbonDB:
+    def __init__(self, hosts: list[str], authentication: typing.Optional[str] = None) -> None:
+        """Initialize a new asyncio-native Carbon session, for applications already running an event loop. The first transaction establishes the connection."""
+        self.hosts = hosts
+        self.authentication = authentication
+        self._reader: typing.Optional[asyncio.StreamReader] = None
+        self._writer: typing.Optional[asyncio.StreamWriter] = None
+
+    # Handle host selection
+    async def _probe(self, host: str) -> typing.Optional[tuple[asyncio.StreamReader, asyncio.StreamWriter, float, str]]:
+        """Connect to the given host, returning its open stream pair and response latency."""
+        address, _, port = host.partition(":")
+        start = time.perf_counter()
+
+        # Setup stream connection
+        try:
+            reader, writer = await asyncio.open_connection(address, int(port) if port else 13051)
+
+            # Send ping and record time
+            writer.write(CarbonDB.build_transaction(Transaction.PING, "TIME"))
+            await writer.drain()
+
+            if _RESP.unpack(await reader.readexactly(5))[0] != 0:
+                logging.debug(f"[ACK] The specified host '{host}' did not respond with HELO, skipping it.")
+                writer.close()
+                return None
+
+        except (OSError, ConnectionError, asyncio.IncompleteReadError):
+            logging.debug(f"[ACK] The specified host '{host}' is unreachable.")
+            return None
+
+        latency = time.perf_counter() - start
+        logging.debug(f"[ACK] Host '{host}' is up and response latency was {round(latency * 1000, 2)}ms.")
+        return reader, writer, latency, host
+
+    async def select_host(self) -> None:
+        """Automatically selects a backend database based on its latency, probing every host concurrently."""
+        open_streams = [result for result in await asyncio.gather(*(self._probe(host) for host in self.hosts)) if result is not None]
+        if not open_streams:
+            raise NoAvailableNodes
+
+        open_streams.sort(key = lambda _: _[2])
+        for _, writer, *_junk in open_streams[1:]:
+            writer.close()  # Kill off the slower nodes
+
+        self._reader, self._writer, latency, current_host = open_streams[0]
+        logging.debug(f"[ACK] Host selected with latency {round(latency * 1000, 2)}ms.")
+
+        # Transmit the peer list
+        if len(self.hosts) > 1:
+            await self.transact(Transaction.PEER, "LIST", "/".join(host for host in self.hosts if host != current_host))
+
+    # Handle transactions
+    async def transact(self, type: Transaction, key: str, value: typing.Optional[typing.Any] = None) -> tuple[int, bytes]:
+        """Build and transmit a transaction to the current backend database."""
+        if self._writer is None:
+            await self.select_host()
+
+        packet = CarbonDB.build_transaction(type, key, value)
+        logging.debug(f"Sending packet to node: {packet}")
+        self._writer.write(packet)
+        await self._writer.drain()
+
+        # Receive result as well as the packet size, with exact reads so a large
+        # response split across segments never comes back short
+        result, packet_size = _RESP.unpack(await self._reader.readexactly(5))
+        return result, await self._reader.readexactly(packet_size)
+
+    async def write(self, key: str, value: typing.Any) -> None:
+        """Write the specified key and its associated value to the database. The value can be anything, as long as it is JSON serializable."""
+        await self.transact(Transaction.WRIT, key, value)
+
+    async def read(self, key: str) -> typing.Any:
+        """Read the value of the specified key from the database."""
+        return json.loads((await self.transact(Transaction.READ, key))[1].decode("utf-8"))
+
+    async def delete(self, key: str) -> None:
+        """Remove the specified key from the database."""
+        await self.transact(Transaction.WIPE, key)
+
+    async def auth(self, password: str) -> None:
+        """Authenticate with the current backend database."""
+        await self.transact(Transaction.AUTH, "PSW", password)
@@ -1,15 +1,16 @@
 # Copyright (c) 2025 iiPython
 
 # Modules
-from enum import Enum
+from enum import IntEnum
 
-# Handle client-server shared typing
-class Response(Enum):
+# Handle client-server shared typing, as IntEnums so members pack straight into
+# struct formats without a .value attribute lookup
+class Response(IntEnum):
     HELO = 0
     OPOK = 1
     FAIL = 2
 
-class Transaction(Enum):
+class Transaction(IntEnum):
     PING = 0
     WRIT = 1
     READ = 2